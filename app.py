@@ -4,21 +4,74 @@
 # Description: Main Flask application file. Handles backend logic.
 # -----------------------------------------------------------------------------
 
+import io
 import os
+import hashlib
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+# --- Thread Pools ---
+# Each gunicorn worker gets an equal share of the cores for TensorFlow's
+# intra-op pool (WEB_CONCURRENCY is exported by gunicorn.conf.py; a single
+# process gets every core), and a single inter-op thread, so concurrent
+# workers don't oversubscribe the CPU. The environment variables must be set
+# before TensorFlow is imported.
+N_WORKERS = max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+# os.cpu_count() reports the host's cores inside a container; the affinity
+# mask reflects the cores this process may actually run on
+if hasattr(os, 'sched_getaffinity'):
+    USABLE_CORES = len(os.sched_getaffinity(0))
+else:
+    USABLE_CORES = os.cpu_count() or 1
+INTRA_OP_THREADS = max(1, USABLE_CORES // N_WORKERS)
+os.environ.setdefault('OMP_NUM_THREADS', str(INTRA_OP_THREADS))
+os.environ.setdefault('TF_NUM_INTRAOP_THREADS', str(INTRA_OP_THREADS))
+os.environ.setdefault('TF_NUM_INTEROP_THREADS', '1')
+
 import pandas as pd
 import numpy as np
 from flask import Flask, request, jsonify, render_template, abort
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
+from openpyxl import load_workbook
 import tensorflow as tf
 import google.generativeai as genai
+import redis
+import orjson
 from dotenv import load_dotenv
 
+# numba is optional: without it forecasts run through TensorFlow
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 # Load environment variables from a .env file
 load_dotenv()
 
+tf.config.threading.set_intra_op_parallelism_threads(INTRA_OP_THREADS)
+tf.config.threading.set_inter_op_parallelism_threads(1)
+
 app = Flask(__name__, template_folder='templates', static_folder='static')
 
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson, which is several times faster than the
+    standard library on the long lists of dates and levels returned by
+    /api/upload, and serializes numpy arrays without converting them first.
+    """
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+app.json = ORJSONProvider(app)
+
 # Enable CORS for all routes
 CORS(app)
 
@@ -47,33 +100,299 @@ except KeyError:
     print("ERROR: GEMINI_API_KEY not found. Please set it as an environment variable.")
     gemini_model = None
 
+# Configure Redis
+# Used to cache Gemini responses across requests and workers. Set REDIS_URL in
+# the .env file or the deployment dashboard; without it caching is disabled.
+CACHE_TTL_SECONDS = 24 * 60 * 60
+# Redis is optional, so an unreachable server must fail fast rather than hold
+# requests for the OS TCP timeout
+REDIS_TIMEOUT_SECONDS = 0.5
+try:
+    # Dashboards often leave the variable defined but empty; treat that as unset
+    redis_url = os.environ.get("REDIS_URL", "").strip()
+    if not redis_url:
+        raise KeyError("REDIS_URL")
+    redis_client = redis.Redis.from_url(redis_url,
+                                        socket_connect_timeout=REDIS_TIMEOUT_SECONDS,
+                                        socket_timeout=REDIS_TIMEOUT_SECONDS)
+    # Reads a cached value and bumps the hit or miss counter in one round trip
+    cache_lookup = redis_client.register_script("""
+        local value = redis.call('GET', KEYS[1])
+        redis.call('INCR', value and KEYS[2] or KEYS[3])
+        return value
+    """)
+except KeyError:
+    print("WARNING: REDIS_URL not found. Response caching is disabled.")
+    redis_client = None
+except ValueError as e:
+    print(f"ERROR: Invalid REDIS_URL ({e}). Response caching is disabled.")
+    redis_client = None
+
 
 # File upload configuration
-UPLOAD_FOLDER = 'uploads'
+# Uploads are parsed straight from memory and never written to disk
 ALLOWED_EXTENSIONS = {'xlsx'}
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+# --- Forecast Settings ---
+# Length of the input window fed to the LSTM and number of days forecast
+TIME_STEP = 100
+N_FUTURE = 30
+# A worker serves at most GUNICORN_THREADS requests at once (see
+# gunicorn.conf.py), so that is also the largest forecast batch it can form
+MAX_BATCH_SIZE = max(1, int(os.environ.get('GUNICORN_THREADS', 4)))
 
 # --- Model Loading ---
-# Load the pre-trained LSTM model
-# The 'standard_model.h5' file should be in the same directory as app.py
-try:
-    # Use compile=False to avoid compatibility issues with different TensorFlow versions
-    model = tf.keras.models.load_model('standard_model.h5', compile=False)
-    # Recompile the model with current TensorFlow version
-    model.compile(optimizer='adam', loss='mean_squared_error')
-    # A simple check to see if model loaded
-    print("LSTM model 'standard_model.h5' loaded successfully.")
-    print(f"Model input shape: {model.input_shape}")
-    print(f"Model output shape: {model.output_shape}")
-except (IOError, ImportError, TypeError) as e:
-    print(f"Error loading model 'standard_model.h5': {e}")
-    print("Please ensure the model file is present and compatible with current TensorFlow version.")
-    model = None
-
-# --- In-Memory Visitor Counter for Admin Dashboard ---
-# Note: This is a simple counter that resets when the server restarts.
-# For a production environment, you'd use a database or a service like Redis.
+# Forecasts are served by the first backend that is available, in this order:
+# the numba kernel, the quantized TFLite model, the SavedModel export, and
+# finally the Keras model itself.
+def load_keras_model():
+    """Loads the pre-trained LSTM model from 'standard_model.h5', or returns None."""
+    # The 'standard_model.h5' file should be in the same directory as app.py
+    try:
+        # Use compile=False to avoid compatibility issues with different TensorFlow versions
+        keras_model = tf.keras.models.load_model('standard_model.h5', compile=False)
+        # Recompile the model with current TensorFlow version
+        keras_model.compile(optimizer='adam', loss='mean_squared_error')
+        # A simple check to see if model loaded
+        print("LSTM model 'standard_model.h5' loaded successfully.")
+        print(f"Model input shape: {keras_model.input_shape}")
+        print(f"Model output shape: {keras_model.output_shape}")
+        return keras_model
+    except (IOError, ImportError, TypeError) as e:
+        print(f"Error loading model 'standard_model.h5': {e}")
+        print("Please ensure the model file is present and compatible with current TensorFlow version.")
+        return None
+
+# The numba kernel needs the Keras layers' weights, so with numba installed the
+# H5 model is loaded up front
+model = load_keras_model() if njit is not None else None
+serving_fn = None
+
+# --- Numba LSTM Kernel ---
+# At these batch sizes TensorFlow's op dispatch and thread-pool overhead dwarf
+# the arithmetic of a 50-unit LSTM. When numba is available and the model is a
+# single LSTM layer followed by a Dense output, its weights are exported to
+# contiguous float32 arrays and the whole rollout runs in one compiled loop with
+# no Python/TensorFlow boundary crossings. The kernel releases the GIL, so
+# concurrent requests run it in parallel on their own threads.
+def extract_lstm_weights(keras_model):
+    """
+    Returns (kernel, recurrent_kernel, bias, dense_kernel, dense_bias, relu) for
+    an LSTM + Dense model the numba kernel can run, or None for any other model.
+    """
+    layers = [layer for layer in keras_model.layers
+              if not isinstance(layer, tf.keras.layers.InputLayer)]
+    if (len(layers) != 2 or not isinstance(layers[0], tf.keras.layers.LSTM)
+            or not isinstance(layers[1], tf.keras.layers.Dense)):
+        return None
+    lstm, dense = layers
+    lstm_config, dense_config = lstm.get_config(), dense.get_config()
+    if (lstm_config['activation'] not in ('relu', 'tanh')
+            or lstm_config['recurrent_activation'] != 'sigmoid'
+            or lstm_config['return_sequences'] or lstm_config['go_backwards']
+            or not lstm_config['use_bias'] or not dense_config['use_bias']
+            or dense_config['activation'] != 'linear' or dense_config['units'] != 1):
+        return None
+
+    # Keras orders the gates as input, forget, cell candidate, output
+    kernel, recurrent_kernel, bias = (np.ascontiguousarray(w, dtype=np.float32) for w in lstm.get_weights())
+    dense_kernel, dense_bias = (np.ascontiguousarray(w, dtype=np.float32) for w in dense.get_weights())
+    if kernel.shape[0] != 1:
+        return None
+    return kernel, recurrent_kernel, bias, dense_kernel, dense_bias, lstm_config['activation'] == 'relu'
+
+lstm_weights = None
+if njit is not None and model is not None:
+    lstm_weights = extract_lstm_weights(model)
+
+# Only flags that keep IEEE inf/NaN semantics: raw water levels are fed in
+# unscaled, so the relu LSTM can produce values where exp() overflows
+NUMBA_FASTMATH = {'contract', 'arcp'}
+
+if lstm_weights is not None:
+    @njit(cache=True, fastmath=NUMBA_FASTMATH, nogil=True)
+    def sigmoid(x):
+        # Only ever exponentiate a non-positive number, so exp() cannot overflow
+        if x >= 0.0:
+            return 1.0 / (1.0 + np.exp(-x))
+        e = np.exp(x)
+        return e / (1.0 + e)
+
+    @njit(cache=True, fastmath=NUMBA_FASTMATH, nogil=True)
+    def lstm_activation(x, relu):
+        return max(x, 0.0) if relu else np.tanh(x)
+
+    @njit(cache=True, fastmath=NUMBA_FASTMATH, nogil=True)
+    def numba_rollout(windows, kernel, recurrent_kernel, bias, dense_kernel, dense_bias, relu, n_future):
+        """Predicts `n_future` steps for each (TIME_STEP, 1) window in `windows`."""
+        batch_size, time_step = windows.shape[0], windows.shape[1]
+        units = recurrent_kernel.shape[0]
+        forecast = np.empty((batch_size, n_future), dtype=np.float32)
+        window = np.empty(time_step, dtype=np.float32)
+        h = np.empty(units, dtype=np.float32)
+        c = np.empty(units, dtype=np.float32)
+        z = np.empty(4 * units, dtype=np.float32)
+
+        for b in range(batch_size):
+            window[:] = windows[b, :, 0]
+            for step in range(n_future):
+                h[:] = 0.0
+                c[:] = 0.0
+                for t in range(time_step):
+                    # Gate pre-activations: x_t * W + h_{t-1} @ U + b
+                    for j in range(4 * units):
+                        z[j] = window[t] * kernel[0, j] + bias[j]
+                    for k in range(units):
+                        for j in range(4 * units):
+                            z[j] += h[k] * recurrent_kernel[k, j]
+                    for j in range(units):
+                        i_gate = sigmoid(z[j])
+                        f_gate = sigmoid(z[units + j])
+                        candidate = lstm_activation(z[2 * units + j], relu)
+                        o_gate = sigmoid(z[3 * units + j])
+                        c[j] = f_gate * c[j] + i_gate * candidate
+                        h[j] = o_gate * lstm_activation(c[j], relu)
+
+                prediction = dense_bias[0]
+                for j in range(units):
+                    prediction += h[j] * dense_kernel[j, 0]
+                forecast[b, step] = prediction
+                # Drop the oldest step and append the prediction
+                window[:-1] = window[1:]
+                window[-1] = prediction
+        return forecast
+
+    # Compile at import (cached on disk across restarts) so the first request
+    # doesn't pay for it, and check the hand-written LSTM against the model's own
+    # forward pass on random windows, including ones at the magnitude of raw,
+    # unscaled water levels; fall back to TensorFlow if they disagree or fail
+    parity_scales = np.array([1.0, 1.0, 1e2, 1e2, 1e3, 1e3], dtype=np.float32)[:, None, None]
+    parity_windows = (np.random.default_rng(0).standard_normal((parity_scales.shape[0], TIME_STEP, 1))
+                      .astype(np.float32) * parity_scales)
+    try:
+        numba_prediction = numba_rollout(parity_windows, *lstm_weights, 1)[:, 0]
+        keras_prediction = model(parity_windows, training=False).numpy()[:, 0]
+        kernel_matches = np.allclose(numba_prediction, keras_prediction, rtol=1e-3, atol=1e-4)
+    except Exception as e:
+        print(f"Error running the numba LSTM kernel: {e}")
+        kernel_matches = False
+    if kernel_matches:
+        print("Forecasts will run on the numba LSTM kernel.")
+    else:
+        print("numba LSTM kernel does not match the model's predictions; using TensorFlow instead.")
+        lstm_weights = None
+
+# --- Quantized TFLite Model ---
+# If a float16-quantized copy of the model has been generated with
+# convert_model.py, serve forecasts from it: the TFLite interpreter has far less
+# per-invoke overhead than TensorFlow on this small-batch, CPU-bound path.
+# float16 only halves the file size; on CPU the weights are expanded back to
+# float32 when the model loads.
+TFLITE_MODEL_PATH = 'standard_model.tflite'
+interpreter = None
+if lstm_weights is None and os.path.exists(TFLITE_MODEL_PATH):
+    try:
+        interpreter = tf.lite.Interpreter(model_path=TFLITE_MODEL_PATH, num_threads=INTRA_OP_THREADS)
+        interpreter.allocate_tensors()
+        tflite_input_index = interpreter.get_input_details()[0]['index']
+        tflite_output_index = interpreter.get_output_details()[0]['index']
+        # The interpreter holds mutable tensor state, so batches take turns
+        tflite_lock = threading.Lock()
+        print(f"TFLite model '{TFLITE_MODEL_PATH}' loaded successfully.")
+    except ValueError as e:
+        print(f"Error loading TFLite model '{TFLITE_MODEL_PATH}': {e}")
+        interpreter = None
+
+# --- SavedModel Export ---
+# Without the numba kernel or a TFLite model, prefer the SavedModel export
+# written by convert_model.py: it loads without parsing H5 or rebuilding Keras
+# layers. Otherwise fall back to the Keras model.
+SAVED_MODEL_DIR = 'standard_model'
+if lstm_weights is None and interpreter is None and os.path.isdir(SAVED_MODEL_DIR):
+    try:
+        saved_model = tf.saved_model.load(SAVED_MODEL_DIR)
+        serving_fn = saved_model.signatures['serving_default']
+        serving_output_key = next(iter(serving_fn.structured_outputs))
+        model = saved_model
+        print(f"LSTM SavedModel '{SAVED_MODEL_DIR}' loaded successfully.")
+    except (IOError, KeyError, ValueError) as e:
+        print(f"Error loading SavedModel '{SAVED_MODEL_DIR}': {e}")
+        serving_fn = None
+
+if lstm_weights is None and interpreter is None and serving_fn is None and njit is None:
+    model = load_keras_model()
+
+# --- Forecast Rollout ---
+# The model always sees fixed-length (TIME_STEP, 1) windows, so the whole
+# autoregressive rollout is compiled into a single graph: a tf.while_loop carries
+# the sliding windows and collects predictions in a TensorArray, so a forecast is
+# one graph launch instead of N_FUTURE Python/TF round trips through model.predict.
+# XLA fuses the LSTM cell's matmuls, bias adds and activations, compiling once per
+# batch size, so every size up to MAX_BATCH_SIZE is compiled at startup.
+
+def forward(x):
+    """Runs one forward pass of whichever LSTM model was loaded."""
+    if serving_fn is not None:
+        return serving_fn(x)[serving_output_key]
+    return model(x, training=False)
+
+if lstm_weights is None and interpreter is None and model is not None:
+    @tf.function(jit_compile=True,
+                 input_signature=[tf.TensorSpec([None, TIME_STEP, 1], tf.float32)])
+    def rollout(windows):
+        """Predicts N_FUTURE steps for a batch of windows, feeding each prediction back in."""
+        forecast = tf.TensorArray(tf.float32, size=N_FUTURE)
+
+        def body(i, windows, forecast):
+            prediction = forward(windows)
+            # Drop the oldest step and append the prediction
+            windows = tf.concat([windows[:, 1:, :], prediction[:, None, :]], axis=1)
+            return i + 1, windows, forecast.write(i, prediction[:, 0])
+
+        _, _, forecast = tf.while_loop(lambda i, windows, forecast: i < N_FUTURE,
+                                       body, (tf.constant(0), windows, forecast))
+        # (N_FUTURE, batch) -> (batch, N_FUTURE)
+        return tf.transpose(forecast.stack())
+
+    # Trace and XLA-compile at import so no request pays for it.
+    # Requests call the concrete function directly, skipping tf.function's
+    # per-call argument matching and trace-cache lookup.
+    try:
+        rollout_fn = rollout.get_concrete_function()
+        for batch_size in range(1, MAX_BATCH_SIZE + 1):
+            rollout_fn(tf.zeros([batch_size, TIME_STEP, 1], tf.float32))
+    except (tf.errors.OpError, ValueError, TypeError) as e:
+        print(f"Error compiling the forecast rollout: {e}")
+        model = None
+
+# --- Model Fingerprint ---
+# Identifies the backend and the exact model files serving forecasts, so cached
+# forecasts are invalidated when a new model is deployed or the backend changes
+def model_fingerprint(backend, path):
+    """Returns '<backend>-<hash>' for a model file or SavedModel directory."""
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    else:
+        paths = [path] if os.path.exists(path) else []
+    for file_path in paths:
+        with open(file_path, 'rb') as f:
+            digest.update(f.read())
+    return f"{backend}-{digest.hexdigest()[:16]}"
+
+if lstm_weights is not None:
+    MODEL_FINGERPRINT = model_fingerprint('numba', 'standard_model.h5')
+elif interpreter is not None:
+    MODEL_FINGERPRINT = model_fingerprint('tflite', TFLITE_MODEL_PATH)
+elif serving_fn is not None:
+    MODEL_FINGERPRINT = model_fingerprint('savedmodel', SAVED_MODEL_DIR)
+else:
+    MODEL_FINGERPRINT = model_fingerprint('keras', 'standard_model.h5')
+
+# --- Visitor Counter for Admin Dashboard ---
+# Kept in Redis when configured, where INCR is atomic and shared by every
+# gunicorn worker. Without Redis this in-memory fallback is per-worker and
+# resets when the server restarts.
 visitor_count = 0
 
 # --- Helper Functions ---
@@ -81,21 +400,185 @@ def allowed_file(filename):
     """Checks if the uploaded file has an allowed extension."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def preprocess_data_for_prediction(df, time_step=100):
+def to_float(value):
+    """Converts a spreadsheet cell value to float, returning NaN if it isn't numeric."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def read_date_level_columns(source):
+    """
+    Streams the 'Date' and 'Level' columns from the active sheet of an .xlsx file.
+    Returns (dates, levels) as numpy arrays, or None if either column is missing.
+    """
+    # Read-only mode streams rows instead of materializing the whole sheet
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        # The stored dimension record is often stale in files not written by
+        # Excel; without this, read-only mode would silently truncate rows/columns
+        sheet.reset_dimensions()
+        header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+        if 'Date' not in header or 'Level' not in header:
+            return None
+        date_idx, level_idx = header.index('Date'), header.index('Level')
+
+        # Only pull the column span covering 'Date' and 'Level' (the openpyxl
+        # equivalent of read_excel's usecols) and re-base the indices onto it
+        first_idx = min(date_idx, level_idx)
+        rows = sheet.iter_rows(min_row=2, min_col=first_idx + 1,
+                               max_col=max(date_idx, level_idx) + 1, values_only=True)
+        date_idx, level_idx = date_idx - first_idx, level_idx - first_idx
+
+        dates, levels = [], []
+        for row in rows:
+            dates.append(row[date_idx] if date_idx < len(row) else None)
+            levels.append(to_float(row[level_idx]) if level_idx < len(row) else np.nan)
+    finally:
+        workbook.close()
+
+    return np.asarray(dates, dtype=object), np.asarray(levels, dtype=np.float64)
+
+# Each request thread reuses one (1, TIME_STEP, 1) input buffer. It is
+# per-thread because gunicorn's gthread workers serve requests concurrently; a
+# request only hands its buffer to the batcher while it waits for the result.
+prediction_buffers = threading.local()
+
+def preprocess_data_for_prediction(levels, time_step=TIME_STEP):
     """Prepares the data for LSTM prediction."""
-    # We only need the 'Level' column for prediction
-    data = df['Level'].values.reshape(-1, 1)
+    buffer = getattr(prediction_buffers, 'buffer', None)
+    if buffer is None or buffer.shape[1] != time_step:
+        buffer = prediction_buffers.buffer = np.zeros((1, time_step, 1), dtype=np.float32)
 
     # For simplicity, we'll use the last `time_step` points to predict the future
     # A more robust solution would involve scaling the data as it was during training
-    if len(data) < time_step:
-        # Pad with zeros if not enough data
-        padding = np.zeros((time_step - len(data), 1))
-        data = np.vstack([padding, data])
-    
-    # Get the last `time_step` data points
-    input_data = data[-time_step:].reshape(1, time_step, 1)
-    return input_data
+    # Pad with zeros at the front if there isn't enough data
+    n = min(levels.size, time_step)
+    buffer[0, :time_step - n, 0] = 0.0
+    buffer[0, time_step - n:, 0] = levels[levels.size - n:]
+    return buffer
+
+def tflite_forecast(windows):
+    """Runs the autoregressive rollout on the quantized TFLite interpreter."""
+    # A single float32 buffer is shifted in place each step instead of
+    # reallocating the whole window with np.append
+    window = np.array(windows, dtype=np.float32, order='C')
+    batch_size = window.shape[0]
+    forecast = np.empty((batch_size, N_FUTURE), dtype=np.float32)
+    with tflite_lock:
+        if interpreter.get_input_details()[0]['shape'][0] != batch_size:
+            interpreter.resize_tensor_input(tflite_input_index, [batch_size, TIME_STEP, 1])
+            interpreter.allocate_tensors()
+        for step in range(N_FUTURE):
+            interpreter.set_tensor(tflite_input_index, window)
+            interpreter.invoke()
+            prediction = interpreter.get_tensor(tflite_output_index)[:, 0]
+            forecast[:, step] = prediction
+            # Update the input for the next prediction
+            window[:, :-1, 0] = window[:, 1:, 0]
+            window[:, -1, 0] = prediction
+    return forecast
+
+def forecast_batch(windows):
+    """Autoregressively predicts N_FUTURE steps for a (batch, TIME_STEP, 1) array of windows."""
+    if lstm_weights is not None:
+        return numba_rollout(np.ascontiguousarray(windows, dtype=np.float32), *lstm_weights, N_FUTURE)
+    if interpreter is not None:
+        return tflite_forecast(windows)
+    return rollout_fn(tf.constant(windows, dtype=tf.float32)).numpy()
+
+# --- Request Micro-Batching ---
+# With the TFLite and TensorFlow backends, concurrent uploads are coalesced: a
+# background thread collects pending forecast requests for up to
+# BATCH_TIMEOUT_SECONDS (or MAX_BATCH_SIZE of them) and runs one batched
+# rollout, so the per-step dispatch cost is paid once per batch rather than
+# once per request.
+BATCH_TIMEOUT_SECONDS = 0.005
+# How long a request waits for its batch before giving up, well under
+# gunicorn's 120 s worker timeout so a stalled batcher can't take the worker down
+FORECAST_TIMEOUT_SECONDS = 30
+forecast_queue = queue.Queue()
+batcher_thread = None
+batcher_lock = threading.Lock()
+
+def run_forecast_batcher():
+    """Background loop that groups queued forecast requests into batched rollouts."""
+    while True:
+        batch = [forecast_queue.get()]
+        deadline = time.monotonic() + BATCH_TIMEOUT_SECONDS
+        while len(batch) < MAX_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(forecast_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        try:
+            forecasts = forecast_batch(np.concatenate([window for window, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            continue
+        for (_, future), forecast in zip(batch, forecasts):
+            future.set_result(forecast)
+
+def forecast_future(input_data):
+    """Autoregressively predicts N_FUTURE steps from a (1, TIME_STEP, 1) window."""
+    global batcher_thread
+    # The numba kernel has no per-call dispatch cost to amortize and runs
+    # without the GIL, so each request runs it directly on its own thread
+    if lstm_weights is not None:
+        return forecast_batch(input_data)[0]
+
+    # Started lazily so that, with gunicorn's preload_app, the thread runs in
+    # each worker rather than in the master (threads do not survive a fork)
+    with batcher_lock:
+        if batcher_thread is None or not batcher_thread.is_alive():
+            batcher_thread = threading.Thread(target=run_forecast_batcher, daemon=True)
+            batcher_thread.start()
+
+    future = Future()
+    forecast_queue.put((input_data, future))
+    return future.result(timeout=FORECAST_TIMEOUT_SECONDS)
+
+def summarize_levels(levels):
+    """Returns a one-line statistical summary (as in DataFrame.describe) of a list of levels."""
+    levels = np.asarray(levels, dtype=np.float64)
+    if levels.size == 0:
+        return "count=0"
+    q25, q50, q75 = np.quantile(levels, [0.25, 0.5, 0.75])
+    # ddof=1 matches the sample standard deviation reported by pandas
+    std = levels.std(ddof=1) if levels.size > 1 else float('nan')
+    return (f"count={levels.size} mean={levels.mean():.3f} std={std:.3f} "
+            f"min={levels.min():.3f} 25%={q25:.3f} 50%={q50:.3f} 75%={q75:.3f} max={levels.max():.3f}")
+
+def cache_key(prefix, content):
+    """Builds a cache key from a SHA-256 hash of the content (str or bytes)."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return f"{prefix}:{hashlib.sha256(content).hexdigest()}"
+
+def cache_get(key):
+    """Returns the cached value for `key`, or None on a miss or if Redis is unavailable."""
+    if redis_client is None:
+        return None
+    try:
+        return cache_lookup(keys=[key, 'cache_hits', 'cache_misses'])
+    except redis.RedisError as e:
+        print(f"Error reading from Redis: {e}")
+        return None
+
+def cache_set(key, value):
+    """Stores `value` under `key` for CACHE_TTL_SECONDS, ignoring Redis failures."""
+    if redis_client is None:
+        return
+    try:
+        redis_client.setex(key, CACHE_TTL_SECONDS, value)
+    except redis.RedisError as e:
+        print(f"Error writing to Redis: {e}")
 
 # --- Flask Routes ---
 
@@ -103,6 +586,12 @@ def preprocess_data_for_prediction(df, time_step=100):
 def index():
     """Serves the main application page."""
     global visitor_count
+    if redis_client is not None:
+        try:
+            redis_client.incr('visitor_count')
+            return render_template('index.html')
+        except redis.RedisError as e:
+            print(f"Error writing to Redis: {e}")
     visitor_count += 1
     return render_template('index.html')
 
@@ -113,8 +602,17 @@ def admin():
 
 @app.route('/api/stats')
 def get_stats():
-    """API endpoint for the admin dashboard to fetch visitor count."""
-    return jsonify({"visitor_count": visitor_count})
+    """API endpoint for the admin dashboard to fetch visitor count and cache stats."""
+    stats = {"visitor_count": visitor_count}
+    if redis_client is not None:
+        try:
+            visitors, hits, misses = redis_client.mget('visitor_count', 'cache_hits', 'cache_misses')
+            stats["visitor_count"] = int(visitors or 0)
+            stats["cache_hits"] = int(hits or 0)
+            stats["cache_misses"] = int(misses or 0)
+        except redis.RedisError as e:
+            print(f"Error reading from Redis: {e}")
+    return jsonify(stats)
 
 @app.route('/api/upload', methods=['POST'])
 def upload_and_forecast():
@@ -122,7 +620,7 @@ def upload_and_forecast():
     Handles file upload, data processing, and forecasting.
     This single endpoint simplifies the frontend logic.
     """
-    if model is None:
+    if model is None and interpreter is None:
         return jsonify({"error": "LSTM model is not loaded on the server."}), 500
 
     if 'file' not in request.files:
@@ -132,64 +630,66 @@ def upload_and_forecast():
         return jsonify({"error": "No selected file"}), 400
 
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        # A repeat upload of the same file is answered straight from the cache,
+        # before any parsing or inference
+        file_bytes = file.read()
+        key = f"{cache_key('forecast', file_bytes)}:{MODEL_FINGERPRINT}:{TIME_STEP}:{N_FUTURE}"
+        cached = cache_get(key)
+        if cached is not None:
+            return app.response_class(cached, mimetype='application/json')
 
         try:
-            # Read the excel file, targeting specific columns
-            df = pd.read_excel(filepath, engine='openpyxl')
-            if 'Date' not in df.columns or 'Level' not in df.columns:
+            # Read only the 'Date' and 'Level' columns of the excel file
+            columns = read_date_level_columns(io.BytesIO(file_bytes))
+            if columns is None:
                 return jsonify({"error": "The .xlsx file must contain 'Date' and 'Level' columns."}), 400
+            dates, levels = columns
 
-            # Ensure 'Date' is datetime and 'Level' is numeric
-            df['Date'] = pd.to_datetime(df['Date'])
-            df['Level'] = pd.to_numeric(df['Level'], errors='coerce')
-            df.dropna(subset=['Date', 'Level'], inplace=True)
-            df.sort_values('Date', inplace=True)
+            # Parse dates ('Level' was already coerced to numeric), drop rows
+            # missing either value and sort by date with a single boolean
+            # mask and a single argsort, rather than a pass per step
+            dates = pd.to_datetime(dates, errors='coerce').to_numpy()
+            mask = ~(np.isnat(dates) | np.isnan(levels))
+            dates, levels = dates[mask], levels[mask]
+            order = np.argsort(dates, kind='stable')
+            dates, levels = dates[order], levels[order]
 
             # --- Forecasting Logic ---
-            time_step = 100
-            input_data = preprocess_data_for_prediction(df, time_step)
+            input_data = preprocess_data_for_prediction(levels, TIME_STEP)
             
             # Predict the next 30 days (as an example)
-            n_future = 30
-            forecast = []
-            current_input = input_data.copy()
-
-            for _ in range(n_future):
-                prediction = model.predict(current_input)[0][0]
-                forecast.append(prediction)
-                # Update the input for the next prediction
-                new_input_step = np.array([[prediction]])
-                current_input = np.append(current_input[:, 1:, :], new_input_step.reshape(1, 1, 1), axis=1)
+            n_future = N_FUTURE
+            forecast = forecast_future(input_data)
 
             # --- Prepare Response Data ---
+            # Truncating to day precision lets numpy format the dates in C
+            # instead of calling strftime once per element
+            dates = dates.astype('datetime64[D]')
             original_data = {
-                "dates": df['Date'].dt.strftime('%Y-%m-%d').tolist(),
-                "levels": df['Level'].tolist()
+                "dates": dates.astype('U10').tolist(),
+                "levels": levels
             }
 
-            last_date = df['Date'].iloc[-1]
-            forecast_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=n_future).strftime('%Y-%m-%d').tolist()
+            forecast_dates = (dates[-1] + np.arange(1, n_future + 1)).astype('U10').tolist()
             
             forecast_data = {
                 "dates": forecast_dates,
-                "levels": [float(f) for f in forecast] # Ensure JSON serializable
+                "levels": forecast
             }
 
-            return jsonify({
+            body = app.json.dumps({
                 "original_data": original_data,
                 "forecast_data": forecast_data
             })
+            cache_set(key, body)
+            return app.response_class(body, mimetype='application/json')
 
+        except FutureTimeoutError:
+            print("Error processing file: timed out waiting for the forecast")
+            return jsonify({"error": "The forecasting service is busy. Please try again shortly."}), 503
         except Exception as e:
             print(f"Error processing file: {e}")
             return jsonify({"error": f"An error occurred while processing the file: {str(e)}"}), 500
-        finally:
-            # Clean up the uploaded file
-            if os.path.exists(filepath):
-                os.remove(filepath)
     else:
         return jsonify({"error": "Invalid file type. Please upload a .xlsx file."}), 400
 
@@ -206,8 +706,8 @@ def analyze_data():
 
     try:
         # Create a concise summary of the data for the prompt
-        original_summary = pd.DataFrame(data['original_data']).describe().to_string()
-        forecast_summary = pd.DataFrame(data['forecast_data']).describe().to_string()
+        original_summary = summarize_levels(data['original_data']['levels'])
+        forecast_summary = summarize_levels(data['forecast_data']['levels'])
 
         prompt = f"""
         As a senior hydrogeologist with 30 years of experience, provide a detailed, professional analysis of the following water level data. The user has provided historical data and an LSTM-based forecast.
@@ -227,7 +727,14 @@ def analyze_data():
         Begin your analysis now.
         """
 
+        # Identical data yields an identical prompt, so reuse the earlier analysis
+        key = cache_key('analyze', prompt)
+        cached = cache_get(key)
+        if cached is not None:
+            return jsonify({"analysis": cached.decode('utf-8')})
+
         response = gemini_model.generate_content(prompt)
+        cache_set(key, response.text)
         return jsonify({"analysis": response.text})
 
     except Exception as e:
@@ -261,7 +768,13 @@ def chat_with_data():
 
         Answer the user's question based *only* on the provided data context.
         """
+        key = cache_key('chat', prompt)
+        cached = cache_get(key)
+        if cached is not None:
+            return jsonify({"answer": cached.decode('utf-8')})
+
         response = gemini_model.generate_content(prompt)
+        cache_set(key, response.text)
         return jsonify({"answer": response.text})
 
     except Exception as e:
@@ -269,6 +782,7 @@ def chat_with_data():
         return jsonify({"error": "Failed to get answer from AI model."}), 500
 
 if __name__ == '__main__':
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
     # Get port from environment variable (Render sets this automatically)
     port = int(os.environ.get('PORT', 5000))
     # Use host='0.0.0.0' to make it accessible on your network
@@ -0,0 +1,41 @@
+
+# -----------------------------------------------------------------------------
+# File: convert_model.py
+# Description: One-time conversion of the Keras LSTM model to a SavedModel (faster
+#              loading) and a float16-quantized TFLite model (faster
+#              CPU inference). Run: python convert_model.py
+# -----------------------------------------------------------------------------
+
+import tensorflow as tf
+
+KERAS_MODEL_PATH = 'standard_model.h5'
+SAVED_MODEL_DIR = 'standard_model'
+TFLITE_MODEL_PATH = 'standard_model.tflite'
+# Must match TIME_STEP in app.py: the interpreter is built for this exact window
+TIME_STEP = 100
+
+if __name__ == '__main__':
+    model = tf.keras.models.load_model(KERAS_MODEL_PATH, compile=False)
+
+    # Convert from a concrete function so the TFLite input is fixed to the
+    # TIME_STEP-long windows the app feeds at inference time; the batch dimension
+    # stays dynamic so the interpreter can be resized for batched requests
+    forward = tf.function(lambda x: model(x, training=False))
+    concrete = forward.get_concrete_function(tf.TensorSpec([None, TIME_STEP, 1], tf.float32))
+
+    # Export a SavedModel whose serving signature accepts any batch of windows
+    module = tf.Module()
+    module.model = model
+    module.serve = tf.function(lambda x: model(x, training=False),
+                               input_signature=[tf.TensorSpec([None, TIME_STEP, 1], tf.float32)])
+    tf.saved_model.save(module, SAVED_MODEL_DIR, signatures={'serving_default': module.serve})
+    print(f"SavedModel written to '{SAVED_MODEL_DIR}/'.")
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete], model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    tflite_model = converter.convert()
+
+    with open(TFLITE_MODEL_PATH, 'wb') as f:
+        f.write(tflite_model)
+    print(f"Quantized model written to '{TFLITE_MODEL_PATH}' ({len(tflite_model)} bytes).")
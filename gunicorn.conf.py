@@ -0,0 +1,35 @@
+
+# -----------------------------------------------------------------------------
+# File: gunicorn.conf.py
+# Description: Gunicorn settings for serving the Flask app in production.
+# -----------------------------------------------------------------------------
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Every worker imports TensorFlow and loads and compiles the model itself, which
+# takes a few hundred MB of RAM per worker, so the default stays small: one
+# worker per usable core, capped at MAX_DEFAULT_WORKERS. os.cpu_count() would
+# report the host's cores inside a container. Set WEB_CONCURRENCY to size this
+# to the instance's memory.
+MAX_DEFAULT_WORKERS = 2
+if hasattr(os, 'sched_getaffinity'):
+    usable_cores = len(os.sched_getaffinity(0))
+else:
+    usable_cores = os.cpu_count() or 1
+workers = int(os.environ.get('WEB_CONCURRENCY', min(usable_cores, MAX_DEFAULT_WORKERS)))
+# app.py reads this to split the cores between workers' TensorFlow thread pools
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+# Each worker imports app.py (and loads and warms up the model) after the fork.
+# app.py runs TensorFlow ops at import, and TensorFlow's thread pools do not
+# survive a fork, so preloading in the master can deadlock the workers. Every
+# backend loads its model through TensorFlow, so leave GUNICORN_PRELOAD unset.
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'false').lower() == 'true'
+
+# Threads let slow Gemini API calls overlap within a worker
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+timeout = 120